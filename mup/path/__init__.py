@@ -1,25 +1,45 @@
-import enum
-import fnmatch
+import importlib
 import logging
 import os
-import random
-import re
-import string
-
-from typing import Generator, Sequence, Union
 
 from mup.path.temp_path import temp_path
 
-__all__ = ['create_directories', 'find_files', 'get_unique_name', 'UniqueMode', 'temp_path']
+__all__ = ['create_directories', 'find_files', 'get_unique_name', 'UniqueMode', 'temp_path',
+           'watch_files', 'FileWatcher', 'WatchAction', 'WatchEvent', 'hash_files', 'find_duplicates',
+           'copy_tree']
 
 logger = logging.getLogger(__name__)
 
-RAND_CHARS = string.ascii_letters + string.digits
+# Public names that live in private submodules. These are only imported the
+# first time they are accessed, so `import mup.path` stays cheap for callers
+# that don't need them.
+_LAZY_ATTRS = {
+    'find_files': '_find',
+    'get_unique_name': '_unique',
+    'UniqueMode': '_unique',
+    'RAND_CHARS': '_unique',
+    'watch_files': '_watch',
+    'FileWatcher': '_watch',
+    'WatchAction': '_watch',
+    'WatchEvent': '_watch',
+    'hash_files': '_hash',
+    'find_duplicates': '_hash',
+    'copy_tree': '_copy',
+}
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
 
 
-class UniqueMode(enum.Enum):
-    RANDOM = 0
-    INTEGER = 1
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
 
 
 def create_directories(path: str, *, is_file: bool = False) -> None:
@@ -49,73 +69,6 @@ def create_directories(path: str, *, is_file: bool = False) -> None:
         pass
 
 
-def find_files(path: str, patterns: Union[str, Sequence], *, recursive: bool = False) -> Generator[str, None, None]:
-    """ Search `path` for files, optionally *recursively*, and yield files that match `pattern`.
-    Note that `pattern` expects an `fnmatch` compatible pattern (e.g. `*.py`), or a list/tuple of patterns.
-    """
-    if isinstance(patterns, str):
-        patterns = [patterns]
-    pattern_regex = re.compile('|'.join([fnmatch.translate(p) for p in patterns]))
-
-    if recursive:
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                if pattern_regex.match(f):
-                    yield os.path.join(root, f)
-    else:
-        for item in os.scandir(path):
-            if pattern_regex.match(item.name):
-                yield item.path
-
-
-def get_unique_name(path: str, *, mode: UniqueMode = UniqueMode.RANDOM, **kwargs) -> str:
-    """ Generate a unique file name by adding either random characters or sequential integers.
-
-    >>> file_path = "/path/to/file.txt"
-    >>> delimiter = "-"
-    >>> unique_path = get_unique_name(file_path, mode=UniqueMode.RANDOM, length=8, force=True, delimiter=delimiter)
-    >>> len(unique_path) == len(file_path) + 8 + len(delimiter)
-    True
-    >>> unique_path = get_unique_name(file_path, mode=UniqueMode.INTEGER, length=3, force=True, delimiter=delimiter)
-    >>> len(unique_path) == len(file_path) + 3 + len(delimiter)
-    True
-    >>> unique_path.endswith(f"file{delimiter}001.txt")
-    True
-
-    """
-    delimiter = kwargs.get('delimiter', "-")
-    max_iterations = kwargs.get("max_iterations", 9999)
-    force_unique = kwargs.get("force", False)
-
-    if mode == UniqueMode.RANDOM:
-        length = kwargs.get("length", 8)
-
-        def unique_key_fn(_: int) -> str:
-            return "".join(random.choices(RAND_CHARS, k=length))
-
-    elif mode == UniqueMode.INTEGER:
-        length = kwargs.get("length", 3)
-
-        def unique_key_fn(iteration: int) -> str:
-            return str(iteration).rjust(length, "0")
-
-    else:
-        raise NotImplementedError
-
-    if not force_unique and not os.path.isfile(path):
-        return path
-
-    directory, file_name = os.path.split(path)
-    file_name, extension = os.path.splitext(file_name)
-
-    for i in range(max_iterations):
-        unique_key = unique_key_fn(i + 1)
-        new_file_name = f"{file_name}{delimiter}{unique_key}{extension}"
-        check_path = os.path.join(directory, new_file_name)
-        if not os.path.isfile(check_path):
-            return check_path
-
-
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
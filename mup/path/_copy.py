@@ -0,0 +1,179 @@
+import errno
+import logging
+import os
+import shutil
+import stat
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+from mup.path import create_directories
+from mup.path._find import _find_entries
+
+logger = logging.getLogger(__name__)
+
+# from <linux/fs.h>, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# largest chunk handed to the kernel in one call
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+
+# errors that mean "this copy method isn't supported here", rather than a real failure
+FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                   errno.ENOTTY, errno.EBADF, errno.EPERM, errno.ETXTBSY, errno.ENOTSOCK}
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    """ Try to share the source's data blocks with the destination (btrfs, xfs, ...). """
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int, offset: int) -> int:
+    while offset < size:
+        count = os.copy_file_range(src_fd, dst_fd, min(size - offset, COPY_CHUNK_SIZE), offset, offset)
+        if count == 0:
+            break
+        offset += count
+    return offset
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int, offset: int) -> int:
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while offset < size:
+        count = os.sendfile(dst_fd, src_fd, offset, min(size - offset, COPY_CHUNK_SIZE))
+        if count == 0:
+            break
+        offset += count
+    return offset
+
+
+def _copy_file_data(src_fd: int, dst_fd: int, size: int) -> None:
+    """ Copy the contents of `src_fd` to `dst_fd`, preferring methods that keep
+    the data in the kernel, and falling back to plain reads and writes. """
+    if _reflink(src_fd, dst_fd):
+        return
+
+    offset = 0
+    kernel_copies = []
+    if hasattr(os, "copy_file_range"):
+        kernel_copies.append(_copy_file_range)
+    # only Linux can `sendfile` between regular files, BSD and macOS need a socket
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        kernel_copies.append(_sendfile)
+    for copy_fn in kernel_copies:
+        try:
+            offset = copy_fn(src_fd, dst_fd, size, offset)
+            break
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRNOS:
+                raise
+
+    # picks up anything not copied above, including data appended since `size` was read
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while True:
+        data = os.read(src_fd, READ_BUFFER_SIZE)
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            view = view[os.write(dst_fd, view):]
+
+
+def _copy_file(src: str, dst: str, size: int) -> None:
+    binary = getattr(os, "O_BINARY", 0)
+    src_fd = os.open(src, os.O_RDONLY | binary)
+    try:
+        # opening the destination truncates it, which would destroy the source
+        try:
+            dst_stat = os.stat(dst)
+        except FileNotFoundError:
+            pass
+        else:
+            if os.path.samestat(os.fstat(src_fd), dst_stat):
+                raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binary, 0o666)
+        try:
+            _copy_file_data(src_fd, dst_fd, size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+
+
+def _is_unchanged(src_stat: os.stat_result, dst: str) -> bool:
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    return dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def copy_tree(src: str, dst: str, patterns: Union[str, Sequence] = "*", *, workers: Optional[int] = None,
+              sync: bool = False) -> List[str]:
+    """ Copy the files below `src` that match `patterns` (see `find_files`) to
+    `dst`, keeping their relative paths and metadata. Only the directories
+    needed for the matched files are created. Files are copied in parallel,
+    using reflinks, `os.copy_file_range` or (on Linux) `os.sendfile` where the
+    platform supports them. If `sync` is `True`, destination files with the same size
+    and mtime as their source are left alone. Returns the copied destination
+    paths. `shutil.SameFileError` is raised rather than copying a file onto
+    itself.
+
+    >>> from mup.path import temp_path
+    >>> with temp_path() as tmp:
+    ...     create_directories(os.path.join(tmp, "src", "1", "file.txt"), is_file=True)
+    ...     open(os.path.join(tmp, "src", "1", "file.txt"), "w").close()
+    ...     copied = copy_tree(os.path.join(tmp, "src"), os.path.join(tmp, "dst"))
+    ...     os.path.isfile(os.path.join(tmp, "dst", "1", "file.txt"))
+    True
+
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same directory")
+
+    jobs = []
+    for entry in _find_entries(src, patterns, recursive=True):
+        try:
+            src_stat = entry.stat()
+        except OSError:
+            continue
+        if not stat.S_ISREG(src_stat.st_mode):
+            continue
+        target = os.path.join(dst, os.path.relpath(entry.path, src))
+        if sync and _is_unchanged(src_stat, target):
+            continue
+        jobs.append((entry.path, target, src_stat.st_size))
+
+    # create each leaf directory once, `os.makedirs` takes care of the parents
+    directories = sorted({os.path.dirname(target) for _, target, _ in jobs})
+    for index, directory in enumerate(directories):
+        if index + 1 < len(directories) and directories[index + 1].startswith(directory + os.sep):
+            continue
+        create_directories(directory)
+
+    logger.debug("Copying %d files from %s to %s", len(jobs), src, dst)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_copy_file, *job) for job in jobs]
+        for future in futures:
+            future.result()
+    return [target for _, target, _ in jobs]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,60 @@
+import fnmatch
+import functools
+import os
+import re
+
+from typing import Generator, Pattern, Sequence, Tuple, Union
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_patterns(patterns: Tuple[str, ...]) -> Pattern:
+    """ Build a single regular expression from a tuple of `fnmatch` patterns.
+    Results are cached, so repeated searches with the same patterns don't
+    pay for translating and compiling them again. """
+    return re.compile('|'.join([fnmatch.translate(p) for p in patterns]))
+
+
+def _find_entries(path: str, patterns: Union[str, Sequence], *,
+                  recursive: bool = False) -> Generator[os.DirEntry, None, None]:
+    """ The `os.DirEntry` version of `find_files`, so that callers can make use
+    of the stat information `os.scandir` has already collected. Recursive
+    searches behave like `os.walk`: only non-directories are matched, and
+    symlinked directories are not followed. """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    pattern_regex = _compile_patterns(tuple(patterns))
+
+    if not recursive:
+        for item in os.scandir(path):
+            if pattern_regex.match(item.name):
+                yield item
+        return
+
+    stack = [path]
+    while stack:
+        root = stack.pop()
+        try:
+            scandir_it = os.scandir(root)
+        except OSError:
+            continue
+        dirs = []
+        with scandir_it:
+            for entry in scandir_it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        dirs.append(entry.path)
+                elif pattern_regex.match(entry.name):
+                    yield entry
+        stack.extend(reversed(dirs))
+
+
+def find_files(path: str, patterns: Union[str, Sequence], *, recursive: bool = False) -> Generator[str, None, None]:
+    """ Search `path` for files, optionally *recursively*, and yield files that match `pattern`.
+    Note that `pattern` expects an `fnmatch` compatible pattern (e.g. `*.py`), or a list/tuple of patterns.
+    """
+    for entry in _find_entries(path, patterns, recursive=recursive):
+        yield entry.path
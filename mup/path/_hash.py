@@ -0,0 +1,251 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import stat
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from mup.path._find import _find_entries
+
+logger = logging.getLogger(__name__)
+
+# the partial hash covers this many bytes at the start and end of a file
+PARTIAL_BLOCK_SIZE = 64 * 1024
+# buffer size used when reading whole files
+READ_BUFFER_SIZE = 1024 * 1024
+
+CACHE_VERSION = 2
+
+FileItem = Tuple[str, os.stat_result]
+
+
+def _partial_digest(path: str, size: int, algorithm: str) -> str:
+    """ Hash the first and last `PARTIAL_BLOCK_SIZE` bytes of a file. For files
+    up to twice that size this covers the entire contents. """
+    h = hashlib.new(algorithm)
+    with open(path, "rb") as fp:
+        h.update(fp.read(PARTIAL_BLOCK_SIZE))
+        if size > PARTIAL_BLOCK_SIZE:
+            fp.seek(max(PARTIAL_BLOCK_SIZE, size - PARTIAL_BLOCK_SIZE))
+            h.update(fp.read(PARTIAL_BLOCK_SIZE))
+    return h.hexdigest()
+
+
+def _full_digest(path: str, algorithm: str) -> str:
+    """ Hash the entire contents of a file. `hashlib` releases the GIL while
+    digesting large buffers, so this scales across threads. """
+    h = hashlib.new(algorithm)
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as fp:
+        while True:
+            count = fp.readinto(buffer)
+            if not count:
+                break
+            h.update(view[:count])
+    return h.hexdigest()
+
+
+class _HashCache(object):
+    """ Persistent digests keyed by (device, inode, size, mtime), so that files
+    which haven't changed since the last run don't need to be read again. Each
+    entry also records the path it was hashed from, which `prune` uses to find
+    entries for files that have since changed or been deleted. """
+    def __init__(self, path: Optional[str], algorithm: str):
+        self.path = path
+        self.algorithm = algorithm
+        self._entries = {}  # type: Dict[str, Dict[str, str]]
+        self._used = set()
+        self._dirty = False
+        if path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning("Ignoring invalid hash cache %s", self.path)
+            return
+        if data.get("version") != CACHE_VERSION or data.get("algorithm") != self.algorithm:
+            logger.debug("Ignoring outdated hash cache %s", self.path)
+            return
+        self._entries = data.get("entries", {})
+
+    @staticmethod
+    def key(st: os.stat_result) -> str:
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+    def get(self, st: os.stat_result, kind: str) -> Optional[str]:
+        key = self.key(st)
+        self._used.add(key)
+        return self._entries.get(key, {}).get(kind)
+
+    def set(self, st: os.stat_result, kind: str, digest: str, path: str) -> None:
+        key = self.key(st)
+        self._used.add(key)
+        entry = self._entries.setdefault(key, {})
+        entry[kind] = digest
+        entry['path'] = os.path.abspath(path)
+        self._dirty = True
+
+    def prune(self, root: str, visited: Dict[str, str]) -> None:
+        """ Drop entries for files below `root` which no longer exist, or which
+        were visited (`visited` maps absolute paths to their current key) and
+        have changed since they were hashed. Entries for files elsewhere, or
+        for unchanged files that simply weren't needed, are kept. """
+        prefix = os.path.join(os.path.abspath(root), "")
+        stale = []
+        for key, entry in self._entries.items():
+            entry_path = entry.get('path')
+            if entry_path is None or key in self._used:
+                continue
+            if entry_path in visited:
+                if visited[entry_path] != key:
+                    stale.append(key)
+            elif entry_path.startswith(prefix) and not os.path.lexists(entry_path):
+                stale.append(key)
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as fp:
+            json.dump({"version": CACHE_VERSION, "algorithm": self.algorithm, "entries": self._entries}, fp)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def _hash_items(items: Sequence[FileItem], kind: str, digest_fn: Callable[[str, os.stat_result], str],
+                cache: _HashCache, executor: ThreadPoolExecutor, *,
+                ignore_errors: bool) -> List[Tuple[FileItem, str]]:
+    """ Digest `items` on `executor`, using `cache` where possible. Returns
+    `(item, digest)` pairs in the same order as `items`. """
+    pending = []
+    for item in items:
+        digest = cache.get(item[1], kind)
+        if digest is not None:
+            pending.append((item, digest))
+        else:
+            pending.append((item, executor.submit(digest_fn, *item)))
+
+    results = []
+    for item, digest in pending:
+        if not isinstance(digest, str):
+            try:
+                digest = digest.result()
+            except OSError as e:
+                if not ignore_errors:
+                    raise
+                logger.warning("Unable to hash %s: %s", item[0], e)
+                continue
+            cache.set(item[1], kind, digest, item[0])
+        results.append((item, digest))
+    return results
+
+
+def _split_groups(groups: Iterable[Sequence[FileItem]], kind: str,
+                  digest_fn: Callable[[str, os.stat_result], str], cache: _HashCache,
+                  executor: ThreadPoolExecutor) -> List[List[FileItem]]:
+    """ Split each group by digest, keeping only those with more than one member. """
+    groups = list(groups)
+    flat = [item for group in groups for item in group]
+    digests = {item[0]: digest for item, digest in _hash_items(flat, kind, digest_fn, cache, executor,
+                                                               ignore_errors=True)}
+    result = []
+    for group in groups:
+        by_digest = collections.defaultdict(list)
+        for item in group:
+            if item[0] in digests:
+                by_digest[digests[item[0]]].append(item)
+        result.extend(g for g in by_digest.values() if len(g) > 1)
+    return result
+
+
+def hash_files(paths: Iterable[str], *, algorithm: str = "sha256", workers: Optional[int] = None,
+               cache_path: Optional[str] = None) -> Dict[str, str]:
+    """ Hash the contents of `paths` in parallel, returning a dictionary of
+    path to hex digest. If `cache_path` is given, digests are stored there and
+    reused on later calls for files whose inode, size and mtime are unchanged.
+
+    >>> from mup.path import temp_path
+    >>> with temp_path() as tmp:
+    ...     file_path = os.path.join(tmp, "file.txt")
+    ...     with open(file_path, "wb") as fp:
+    ...         _ = fp.write(b"test")
+    ...     hash_files([file_path], algorithm="md5")[file_path]
+    '098f6bcd4621d373cade4e832627b4f6'
+
+    """
+    items = [(p, os.stat(p)) for p in paths]
+    cache = _HashCache(cache_path, algorithm)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = _hash_items(items, "full", lambda p, _: _full_digest(p, algorithm), cache, executor,
+                              ignore_errors=False)
+    cache.save()
+    return {item[0]: digest for item, digest in results}
+
+
+def find_duplicates(path: str, patterns: Union[str, Sequence], *, recursive: bool = False,
+                    algorithm: str = "sha256", workers: Optional[int] = None,
+                    cache_path: Optional[str] = None) -> List[List[str]]:
+    """ Find files with identical contents among those `find_files` would
+    return, and return them as a sorted list of groups of paths. Files are
+    first grouped by size, then by a hash of their first and last blocks, and
+    only files which still collide are hashed in full. Files which can't be
+    read are skipped.
+
+    Only distinct files are reported: symbolic links are skipped, and of
+    several hard links to the same file only the first one found is included.
+    Deleting all but one path of each group therefore never loses data.
+
+    `cache_path` works the same way as it does for `hash_files`, and may be
+    shared with it or with other searches. Entries for files below `path`
+    that have been deleted, or that were found to have changed, are removed.
+    """
+    by_size = collections.defaultdict(list)
+    seen = set()
+    visited = {}
+    for entry in _find_entries(path, patterns, recursive=recursive):
+        try:
+            if entry.is_symlink():
+                continue
+            st = entry.stat()
+        except OSError:
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        visited[os.path.abspath(entry.path)] = _HashCache.key(st)
+        file_id = (st.st_dev, st.st_ino)
+        if file_id in seen:
+            continue
+        seen.add(file_id)
+        by_size[st.st_size].append((entry.path, st))
+    candidates = [g for g in by_size.values() if len(g) > 1]
+
+    cache = _HashCache(cache_path, algorithm)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        groups = _split_groups(candidates, "partial",
+                               lambda p, st: _partial_digest(p, st.st_size, algorithm), cache, executor)
+        # the partial hash already covers small files completely
+        complete = [g for g in groups if g[0][1].st_size <= PARTIAL_BLOCK_SIZE * 2]
+        remaining = [g for g in groups if g[0][1].st_size > PARTIAL_BLOCK_SIZE * 2]
+        complete.extend(_split_groups(remaining, "full", lambda p, _: _full_digest(p, algorithm), cache, executor))
+    cache.prune(path, visited)
+    cache.save()
+
+    return sorted(sorted(item[0] for item in group) for group in complete)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
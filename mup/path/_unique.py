@@ -0,0 +1,64 @@
+import enum
+import os
+import random
+import string
+
+RAND_CHARS = string.ascii_letters + string.digits
+
+
+class UniqueMode(enum.Enum):
+    RANDOM = 0
+    INTEGER = 1
+
+
+def get_unique_name(path: str, *, mode: UniqueMode = UniqueMode.RANDOM, **kwargs) -> str:
+    """ Generate a unique file name by adding either random characters or sequential integers.
+
+    >>> file_path = "/path/to/file.txt"
+    >>> delimiter = "-"
+    >>> unique_path = get_unique_name(file_path, mode=UniqueMode.RANDOM, length=8, force=True, delimiter=delimiter)
+    >>> len(unique_path) == len(file_path) + 8 + len(delimiter)
+    True
+    >>> unique_path = get_unique_name(file_path, mode=UniqueMode.INTEGER, length=3, force=True, delimiter=delimiter)
+    >>> len(unique_path) == len(file_path) + 3 + len(delimiter)
+    True
+    >>> unique_path.endswith(f"file{delimiter}001.txt")
+    True
+
+    """
+    delimiter = kwargs.get('delimiter', "-")
+    max_iterations = kwargs.get("max_iterations", 9999)
+    force_unique = kwargs.get("force", False)
+
+    if mode == UniqueMode.RANDOM:
+        length = kwargs.get("length", 8)
+
+        def unique_key_fn(_: int) -> str:
+            return "".join(random.choices(RAND_CHARS, k=length))
+
+    elif mode == UniqueMode.INTEGER:
+        length = kwargs.get("length", 3)
+
+        def unique_key_fn(iteration: int) -> str:
+            return str(iteration).rjust(length, "0")
+
+    else:
+        raise NotImplementedError
+
+    if not force_unique and not os.path.isfile(path):
+        return path
+
+    directory, file_name = os.path.split(path)
+    file_name, extension = os.path.splitext(file_name)
+
+    for i in range(max_iterations):
+        unique_key = unique_key_fn(i + 1)
+        new_file_name = f"{file_name}{delimiter}{unique_key}{extension}"
+        check_path = os.path.join(directory, new_file_name)
+        if not os.path.isfile(check_path):
+            return check_path
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,374 @@
+import enum
+import logging
+import os
+import stat
+import struct
+import sys
+import time
+
+from collections import namedtuple
+from typing import Dict, Generator, List, Optional, Sequence, Set, Tuple, Union
+
+from mup.path._find import _compile_patterns, find_files
+
+logger = logging.getLogger(__name__)
+
+WatchEvent = namedtuple("WatchEvent", ["action", "path"])
+
+StatKey = Tuple[int, int]
+
+# constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                 IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class WatchAction(enum.Enum):
+    CREATED = 0
+    MODIFIED = 1
+    DELETED = 2
+
+
+def _stat_key(path: str) -> Optional[StatKey]:
+    """ Return `(mtime_ns, size)` for a regular file, or `None` if `path` is
+    missing or isn't a regular file. """
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class _PollingBackend(object):
+    """ Detects changes by re-scanning the tree and comparing mtimes/sizes. """
+    def __init__(self, scan_fn, snapshot: Dict[str, StatKey], *, interval: float):
+        self._scan_fn = scan_fn
+        self._snapshot = dict(snapshot)
+        self._pending = None
+        self.interval = interval
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan_fn()
+            if current != self._snapshot:
+                self._pending = current
+                return True
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def read(self) -> Tuple[Set[str], Set[str]]:
+        if self._pending is None:
+            return set(), set()
+        current, self._pending = self._pending, None
+        changed = {p for p in set(current) | set(self._snapshot) if current.get(p) != self._snapshot.get(p)}
+        self._snapshot = current
+        return changed, set()
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyBackend(object):
+    """ Linux inotify through ctypes. One watch is added per directory. """
+    def __init__(self, path: str, *, recursive: bool):
+        import ctypes
+        import select
+
+        self._select = select.select
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._ctypes = ctypes
+        self.path = path
+        self.recursive = recursive
+        self._watches = {}  # type: Dict[int, str]
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            self._raise_errno()
+        try:
+            self._add_tree(path)
+        except OSError:
+            self.close()
+            raise
+
+    def _raise_errno(self, path: Optional[str] = None):
+        err = self._ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path)
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), IN_WATCH_MASK)
+        if wd < 0:
+            self._raise_errno(path)
+        # re-adding a watch for a moved directory returns its existing
+        # descriptor, so this also fixes up stale paths
+        self._watches[wd] = path
+
+    def _add_tree(self, path: str) -> None:
+        self._add_watch(path)
+        if self.recursive:
+            for root, dirs, _ in os.walk(path):
+                for d in dirs:
+                    try:
+                        self._add_watch(os.path.join(root, d))
+                    except (FileNotFoundError, NotADirectoryError):
+                        pass
+
+    def _try_add_tree(self, path: str) -> None:
+        """ `_add_tree` for directories that appear while watching. Failures
+        (e.g. running out of watches) are logged rather than raised, so a long
+        running watch keeps going. The caller still rescans `path`. """
+        try:
+            self._add_tree(path)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        except OSError as e:
+            logger.warning("Unable to watch %s, changes below it may be missed: %s", path, e)
+
+    def _remove_tree(self, path: str) -> None:
+        prefix = path + os.sep
+        for wd, watched in list(self._watches.items()):
+            if watched == path or watched.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        readable, _, _ = self._select([self._fd], [], [], timeout)
+        return bool(readable)
+
+    def read(self) -> Tuple[Set[str], Set[str]]:
+        """ Drain pending events, returning the touched file and directory paths. """
+        files, dirs = set(), set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning("inotify queue overflowed, rescanning")
+                    # directories created while events were dropped need watches too
+                    self._try_add_tree(self.path)
+                    dirs.add(self.path)
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                parent = self._watches.get(wd)
+                if parent is None:
+                    continue
+                if not name:
+                    # event on the watched directory itself
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        dirs.add(parent)
+                    continue
+
+                path = os.path.join(parent, name)
+                if not mask & IN_ISDIR:
+                    files.add(path)
+                elif self.recursive:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._try_add_tree(path)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        self._remove_tree(path)
+                    dirs.add(path)
+        return files, dirs
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._watches.clear()
+
+
+class FileWatcher(object):
+    """ Watch `path` for files matching `patterns` (see `find_files`) being
+    created, modified or deleted. The tree is scanned once on creation, after
+    which only changes are reported. On Linux inotify is used, other platforms
+    (or `force_polling=True`) fall back to comparing mtimes every `interval`
+    seconds. Bursts of changes are coalesced until no new changes have been
+    seen for `debounce` seconds, but for no longer than `max_latency` seconds.
+    A missing `path` raises `FileNotFoundError`.
+
+    >>> from mup.path import temp_path
+    >>> with temp_path() as tmp, FileWatcher(tmp, "*.txt") as watcher:
+    ...     open(os.path.join(tmp, "file.txt"), "w").close()
+    ...     [(e.action, os.path.basename(e.path)) for e in watcher.poll(timeout=5)]
+    [(<WatchAction.CREATED: 0>, 'file.txt')]
+
+    """
+    def __init__(self, path: str, patterns: Union[str, Sequence], *, recursive: bool = False,
+                 debounce: float = 0.1, max_latency: float = 1.0, interval: float = 1.0,
+                 force_polling: bool = False):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.path = os.path.abspath(path)
+        self.patterns = tuple(patterns)
+        self.recursive = recursive
+        self.debounce = debounce
+        self.max_latency = max_latency
+        self._pattern_regex = _compile_patterns(self.patterns)
+
+        self._backend = None
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                # add watches before scanning so nothing slips in between
+                self._backend = _InotifyBackend(self.path, recursive=recursive)
+            except (FileNotFoundError, NotADirectoryError):
+                raise
+            except OSError as e:
+                logger.warning("Unable to use inotify, falling back to polling: %s", e)
+        if self._backend is None:
+            # recursive scans skip unreadable directories, so check the root explicitly
+            os.scandir(self.path).close()
+        self._files = self._scan()
+        if self._backend is None:
+            self._backend = _PollingBackend(self._scan, self._files, interval=interval)
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self._backend.close()
+
+    def _scan(self) -> Dict[str, StatKey]:
+        files = {}
+        for p in find_files(self.path, self.patterns, recursive=self.recursive):
+            key = _stat_key(p)
+            if key is not None:
+                files[p] = key
+        return files
+
+    def _in_dirs(self, path: str, dirs: Set[str]) -> bool:
+        """ True if any parent directory of `path`, up to the watched root, is in `dirs`. """
+        parent = os.path.dirname(path)
+        while len(parent) >= len(self.path):
+            if parent in dirs:
+                return True
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                break
+            parent = next_parent
+        return False
+
+    def _expand(self, files: Set[str], dirs: Set[str]) -> Set[str]:
+        paths = set(files)
+        if not dirs:
+            return paths
+        # nested directories are covered by rescanning their top-most parent
+        for d in dirs:
+            if not self._in_dirs(d, dirs) and os.path.isdir(d):
+                paths.update(find_files(d, self.patterns, recursive=self.recursive))
+        # a single pass over the known files picks up anything removed with a directory
+        paths.update(p for p in self._files if self._in_dirs(p, dirs))
+        return paths
+
+    def _reconcile(self, paths: Set[str]) -> List[WatchEvent]:
+        events = []
+        for p in sorted(paths):
+            old = self._files.get(p)
+            new = _stat_key(p)
+            if old == new:
+                continue
+            if new is None:
+                del self._files[p]
+                events.append(WatchEvent(WatchAction.DELETED, p))
+            else:
+                self._files[p] = new
+                events.append(WatchEvent(WatchAction.CREATED if old is None else WatchAction.MODIFIED, p))
+        return events
+
+    def files(self) -> List[str]:
+        """ The matching files currently known to the watcher. """
+        return sorted(self._files)
+
+    def _read(self) -> Tuple[Set[str], Set[str]]:
+        """ Read from the backend, dropping files that can't match the patterns. """
+        files, dirs = self._backend.read()
+        files = {p for p in files if self._pattern_regex.match(os.path.basename(p))}
+        return files, dirs
+
+    def poll(self, timeout: Optional[float] = None) -> List[WatchEvent]:
+        """ Wait up to `timeout` seconds (forever if `None`) for changes and
+        return them. An empty list is returned if nothing changed in time. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._backend.wait(remaining):
+                return []
+            files, dirs = self._read()
+            if files or dirs:
+                # keep collecting until things go quiet, only relevant changes
+                # extend the window, and never beyond `max_latency` or `timeout`
+                now = time.monotonic()
+                settle_deadline = now + self.max_latency
+                if deadline is not None:
+                    settle_deadline = min(settle_deadline, deadline)
+                quiet_deadline = now + self.debounce
+                while True:
+                    now = time.monotonic()
+                    wait_time = min(quiet_deadline, settle_deadline) - now
+                    if wait_time <= 0 or not self._backend.wait(wait_time):
+                        break
+                    more_files, more_dirs = self._read()
+                    if more_files or more_dirs:
+                        files |= more_files
+                        dirs |= more_dirs
+                        quiet_deadline = time.monotonic() + self.debounce
+                events = self._reconcile(self._expand(files, dirs))
+                if events:
+                    return events
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+
+
+def watch_files(path: str, patterns: Union[str, Sequence], *, recursive: bool = False,
+                **kwargs) -> Generator[WatchEvent, None, None]:
+    """ Like `find_files`, but instead of listing what is there, run forever and
+    yield a `WatchEvent` whenever a matching file is created, modified or
+    deleted. Additional keyword arguments are passed on to `FileWatcher`.
+
+    >>> for event in watch_files("/path/to/data", "*.parquet", recursive=True):  # doctest: +SKIP
+    ...     print(event.action, event.path)
+
+    """
+    with FileWatcher(path, patterns, recursive=recursive, **kwargs) as watcher:
+        while True:
+            yield from watcher.poll()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
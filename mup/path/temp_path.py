@@ -2,9 +2,7 @@ import contextlib
 import errno
 import logging
 import os
-import shutil
 import stat
-import tempfile
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +39,10 @@ def temp_path():
     False
 
     """
+    # deferred so that importing `mup.path` doesn't pull these in
+    import shutil
+    import tempfile
+
     tmp_dir = tempfile.mkdtemp()
     logger.debug(f"created temp folder {tmp_dir}")
     try:
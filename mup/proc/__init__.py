@@ -1,14 +1,71 @@
+import functools
+import importlib
 import os
-import subprocess
 import sys
 
-from .command_runner import CommandRunner, CommandResult
+from collections.abc import Iterable
 
+__all__ = ['CommandRunner', 'CommandResult', 'PipelineResult', 'CommandCache', 'open_file', 'open_files']
 
-def open_file(filename: str) -> None:
-    """ A basic attempt at a cross platform version of `os.startfile`. """
+# `command_runner` pulls in `subprocess`, so it and the modules built on it
+# are only imported the first time one of their names is accessed.
+_LAZY_ATTRS = {
+    'CommandRunner': 'command_runner',
+    'CommandResult': 'command_runner',
+    'PipelineResult': 'command_runner',
+    'CommandCache': 'command_cache',
+    'CacheStats': 'command_cache',
+}
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
+
+@functools.lru_cache(maxsize=None)
+def _find_opener(platform: str) -> str:
+    """ Resolve the opener's full path once per platform, rather than searching
+    `PATH` every time a file is opened. """
+    import shutil
+    opener = "open" if platform == "darwin" else "xdg-open"
+    return shutil.which(opener) or opener
+
+
+def _reap(proc) -> None:
+    proc.wait()
+
+
+def open_file(filename: str, *, wait: bool = True) -> None:
+    """ A basic attempt at a cross platform version of `os.startfile`. If `wait`
+    is `False` the opener is started in its own session and this returns right
+    away. The child is reaped on a background thread so it doesn't linger as a
+    zombie. """
     if sys.platform == "win32":
         os.startfile(filename)
     else:
-        opener = "open" if sys.platform == "darwin" else "xdg-open"
-        subprocess.call([opener, filename])
+        import subprocess
+        opener = _find_opener(sys.platform)
+        if wait:
+            subprocess.call([opener, filename])
+        else:
+            import threading
+            proc = subprocess.Popen([opener, filename], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL, start_new_session=True)
+            threading.Thread(target=_reap, args=(proc, ), daemon=True).start()
+
+
+def open_files(filenames: Iterable, *, wait: bool = False) -> None:
+    """ Open several files with `open_file`. By default none of them are waited
+    on, so the openers all start at once. """
+    for filename in filenames:
+        open_file(filename, wait=wait)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+
+from collections import namedtuple
+from typing import Mapping, Optional, Sequence, Union
+
+from mup.path import create_directories, hash_files
+from mup.proc.command_runner import CommandResult
+
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "entries", "size"])
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+CACHE_VERSION = 1
+
+
+def _normalize_command(command: Union[bytes, str, Sequence]) -> Union[str, list]:
+    if isinstance(command, (bytes, str)):
+        return os.fsdecode(command)
+    return [os.fsdecode(os.fspath(c)) for c in command]
+
+
+class CommandCache(object):
+    """ A ccache style store for the results of deterministic commands. Results
+    are saved as files in `path` and keyed on the command, working directory,
+    selected environment variables and the contents of declared input files.
+    Once the cache grows past `max_size` bytes the least recently used results
+    are evicted. Pass an instance to `CommandRunner` and use `cached=True` when
+    running commands whose results can be reused.
+
+    >>> from mup.path import temp_path
+    >>> from mup.proc import CommandRunner
+    >>> with temp_path() as tmp:
+    ...     c = CommandRunner(cache=CommandCache(tmp))
+    ...     first = c.run(("echo", "test"), cached=True)
+    ...     second = c.run(("echo", "test"), cached=True)
+    ...     first == second, c.cache.hits, c.cache.misses
+    (True, 1, 1)
+
+    """
+    def __init__(self, path: str, *, max_size: int = DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # running total of the entry sizes, read from disk on the first `set`
+        self._size = None  # type: Optional[int]
+        create_directories(path)
+
+    @staticmethod
+    def key(command: Union[bytes, str, Sequence], *, cwd: str, env: Mapping[str, str],
+            env_keys: Sequence[str] = (), inputs: Sequence[str] = (), shell: bool = False) -> str:
+        """ Build the cache key for a command. Only the environment variables
+        named in `env_keys` are taken into account. Relative `inputs` are
+        resolved against `cwd`, like the command itself would. """
+        cwd = os.path.abspath(cwd)
+        inputs = [os.path.join(cwd, p) for p in inputs]
+        input_digests = hash_files(inputs) if inputs else {}
+        data = {
+            'version': CACHE_VERSION,
+            'command': _normalize_command(command),
+            'cwd': cwd,
+            'env': {k: env.get(k) for k in sorted(env_keys)},
+            'inputs': sorted((os.path.normpath(p), d) for p, d in input_digests.items()),
+            'shell': shell,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key: str) -> Optional[CommandResult]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf8") as fp:
+                data = json.load(fp)
+            # bump the mtime, it's used to find the least recently used entries
+            os.utime(entry_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except ValueError:
+            logger.warning("Ignoring invalid cache entry %s", entry_path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CommandResult(data['result'], data['stdout'], data['stderr'])
+
+    def set(self, key: str, result: CommandResult) -> None:
+        if self._size is None:
+            self._size = sum(e[1] for e in self._entries())
+        entry_path = self._entry_path(key)
+        try:
+            self._size -= os.stat(entry_path).st_size
+        except FileNotFoundError:
+            pass
+        data = json.dumps(result._asdict()).encode("utf8")
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, entry_path)
+        self._size += len(data)
+        # only scan the directory once the cache might actually be too large
+        if self._size > self.max_size:
+            self._evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for item in os.scandir(self.path):
+            if not item.name.endswith(".json"):
+                continue
+            try:
+                st = item.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, item.path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(e[1] for e in entries)
+        if total > self.max_size:
+            for _, size, entry_path in sorted(entries):
+                try:
+                    os.remove(entry_path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.debug("Evicted cache entry %s", entry_path)
+                if total <= self.max_size:
+                    break
+        self._size = total
+
+    def clear(self) -> None:
+        for _, _, entry_path in self._entries():
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
+
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        return CacheStats(self.hits, self.misses, len(entries), sum(e[1] for e in entries))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,12 +1,14 @@
 import logging
 import os
 import subprocess
+import threading
 
 from collections import namedtuple
 from typing import List, Sequence, Union
 
 
 CommandResult = namedtuple("CommandResult", ["result", "stdout", "stderr"])
+PipelineResult = namedtuple("PipelineResult", ["result", "stdout", "stderr", "stages"])
 
 logger = logging.getLogger(__name__)
 
@@ -31,10 +33,17 @@ class CommandRunner(object):
     >>> result.stdout.count("TEST=1234")
     1
 
+    Results can be reused for deterministic commands by passing a
+    `CommandCache` as `cache`, and running commands with `cached=True`. The
+    environment variables named in `cache_env` and the contents of the files in
+    `cache_inputs` become part of the cache key. Only successful commands that
+    are run silently are cached.
+
     """
     def __init__(self, **kwargs):
         self.cwd = kwargs.get('cwd', os.getcwd())
         self.env = kwargs.get('env', os.environ.copy())
+        self.cache = kwargs.get('cache', None)
 
     def _split_path_var(self, key: str) -> List[str]:
         values = self.env.get(key, "").split(os.pathsep)
@@ -75,6 +84,22 @@ class CommandRunner(object):
             subprocess_args['stdout'] = subprocess.PIPE
             subprocess_args['stderr'] = subprocess.PIPE
 
+        cache_key = None
+        if kwargs.get('cached', False):
+            if self.cache is None:
+                raise ValueError("cached=True requires a CommandRunner created with a cache")
+            if silent:
+                cache_key = self.cache.key(command, cwd=subprocess_args['cwd'], env=env,
+                                           env_keys=kwargs.get('cache_env', ()),
+                                           inputs=kwargs.get('cache_inputs', ()),
+                                           shell=subprocess_args['shell'])
+                cached_result = self.cache.get(cache_key)
+                if cached_result is not None:
+                    logger.debug("Using cached result for command %s", str(command))
+                    return cached_result
+            else:
+                logger.debug("Not caching command %s, output is not captured", str(command))
+
         logger.debug("Running command %s", str(command))
         logger.debug("Command environment %s", str(env))
         logger.debug("Command working directory %s", subprocess_args['cwd'])
@@ -85,10 +110,101 @@ class CommandRunner(object):
         if silent:
             proc.stdout.close()
             proc.stderr.close()
-            return CommandResult(result, stdout, stderr)
+            command_result = CommandResult(result, stdout, stderr)
+            if cache_key is not None and result == 0:
+                self.cache.set(cache_key, command_result)
+            return command_result
         else:
             return CommandResult(result, None, None)
 
+    def pipeline(self, commands: Sequence[Sequence], **kwargs) -> PipelineResult:
+        """ Run `commands` with the output of each one connected directly to
+        the input of the next, like `cmd1 | cmd2 | cmd3` in a shell but without
+        starting one. The data never passes through Python. The returned
+        `PipelineResult` has a `CommandResult` for every stage in `stages`, and
+        like `set -o pipefail` its `result` is the return code of the last stage
+        that failed, or 0. If run silently, the final stage's stdout and every
+        stage's stderr are captured.
+
+        >>> c = CommandRunner()
+        >>> result = c.pipeline([("printf", "b\\na\\nb\\n"), ("sort", ), ("uniq", )])
+        >>> result.result, result.stdout
+        (0, 'a\\nb\\n')
+
+        """
+        if not commands:
+            raise ValueError("A pipeline requires at least one command")
+        env = kwargs.get('env', self.env)
+        cwd = kwargs.get('cwd', self.cwd)
+        silent = kwargs.get('silent', True)
+
+        logger.debug("Running pipeline %s", " | ".join(str(c) for c in commands))
+        logger.debug("Command environment %s", str(env))
+        logger.debug("Command working directory %s", cwd)
+
+        procs = []
+        try:
+            for index, command in enumerate(commands):
+                last = index == len(commands) - 1
+                subprocess_args = {
+                    'cwd': cwd,
+                    'env': env,
+                    'stdin': procs[-1].stdout if procs else None,
+                    'stdout': subprocess.PIPE if not last or silent else None,
+                    'stderr': subprocess.PIPE if silent else None,
+                    'universal_newlines': True,
+                    'encoding': 'utf8',
+                }
+                procs.append(subprocess.Popen(command, **subprocess_args))
+                if len(procs) > 1:
+                    # only the child needs this now, closing our copy lets the
+                    # previous stage see SIGPIPE if the next one exits early
+                    procs[-2].stdout.close()
+        except BaseException:
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+                for stream in (proc.stdout, proc.stderr):
+                    if stream is not None:
+                        stream.close()
+            raise
+
+        # drain the stderr pipes concurrently so no stage blocks on a full pipe
+        stderr_output = [None] * len(procs)
+        readers = []
+        if silent:
+            for index, proc in enumerate(procs[:-1]):
+                reader = threading.Thread(target=_read_stream, args=(proc.stderr, stderr_output, index))
+                reader.daemon = True
+                reader.start()
+                readers.append(reader)
+
+        stdout, stderr_output[-1] = procs[-1].communicate()
+        for proc in procs:
+            proc.wait()
+        for reader in readers:
+            reader.join()
+        if silent:
+            for proc in procs[:-1]:
+                proc.stderr.close()
+            procs[-1].stdout.close()
+            procs[-1].stderr.close()
+
+        stages = []
+        for index, proc in enumerate(procs):
+            last = index == len(procs) - 1
+            stages.append(CommandResult(proc.returncode, stdout if last else None, stderr_output[index]))
+
+        result = 0
+        for stage in stages:
+            if stage.result != 0:
+                result = stage.result
+        return PipelineResult(result, stdout, stderr_output[-1], stages)
+
+
+def _read_stream(stream, output: list, index: int) -> None:
+    output[index] = stream.read()
+
 
 if __name__ == '__main__':
     import doctest
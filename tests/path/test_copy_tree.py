@@ -0,0 +1,133 @@
+import errno
+import os
+import shutil
+import unittest
+
+from unittest import mock
+
+from mup.path import create_directories, temp_path
+from mup.path import copy_tree, find_files
+from mup.path import _copy
+
+FILES = (
+    "file01.txt",
+    "file02.py",
+    "1/file01.txt",
+    "1/file02.py",
+    "1/1/file01.txt",
+    "2/2/2/file02.py",
+)
+
+
+def write_file(path: str, data: bytes) -> None:
+    create_directories(path, is_file=True)
+    with open(path, "wb") as fp:
+        fp.write(data)
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+class TestCopyTree(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = temp_path()
+        self.tmp = self._tmp.__enter__()
+        self.src = os.path.join(self.tmp, "src")
+        self.dst = os.path.join(self.tmp, "dst")
+        for f in FILES:
+            write_file(os.path.join(self.src, *f.split("/")), f.encode() * 1000)
+
+    def tearDown(self) -> None:
+        self._tmp.__exit__(None, None, None)
+
+    def assertTreeCopied(self, patterns):
+        expected = sorted(os.path.relpath(p, self.src) for p in find_files(self.src, patterns, recursive=True))
+        actual = sorted(os.path.relpath(p, self.dst) for p in find_files(self.dst, "*", recursive=True))
+        self.assertEqual(actual, expected)
+        for rel_path in expected:
+            src_path = os.path.join(self.src, rel_path)
+            dst_path = os.path.join(self.dst, rel_path)
+            self.assertEqual(read_file(src_path), read_file(dst_path))
+            self.assertEqual(os.stat(src_path).st_mtime_ns, os.stat(dst_path).st_mtime_ns)
+
+    def test_copy_tree(self):
+        copied = copy_tree(self.src, self.dst, workers=4)
+        self.assertEqual(len(copied), len(FILES))
+        self.assertTreeCopied("*")
+
+    def test_copy_tree_patterns(self):
+        copied = copy_tree(self.src, self.dst, "*.txt")
+        self.assertEqual(len(copied), 3)
+        self.assertTreeCopied("*.txt")
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "2")))
+
+    def test_copy_tree_sync(self):
+        copy_tree(self.src, self.dst)
+        self.assertEqual(copy_tree(self.src, self.dst, sync=True), [])
+        changed = os.path.join(self.src, "1", "file02.py")
+        write_file(changed, b"changed")
+        self.assertEqual(copy_tree(self.src, self.dst, sync=True), [os.path.join(self.dst, "1", "file02.py")])
+        self.assertTreeCopied("*")
+        self.assertEqual(len(copy_tree(self.src, self.dst)), len(FILES))
+
+    def test_copy_tree_large_file(self):
+        data = os.urandom(_copy.READ_BUFFER_SIZE * 3 + 17)
+        write_file(os.path.join(self.src, "large.bin"), data)
+        copy_tree(self.src, self.dst, "*.bin")
+        self.assertEqual(read_file(os.path.join(self.dst, "large.bin")), data)
+
+    def test_copy_tree_fallback(self):
+        unsupported = OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        with mock.patch.object(_copy, "_reflink", return_value=False), \
+                mock.patch.object(_copy, "_copy_file_range", side_effect=unsupported), \
+                mock.patch.object(_copy, "_sendfile", side_effect=unsupported):
+            copy_tree(self.src, self.dst)
+        self.assertTreeCopied("*")
+
+    def test_copy_tree_sendfile_not_socket(self):
+        # BSD style sendfile only writes to sockets
+        not_socket = OSError(errno.ENOTSOCK, os.strerror(errno.ENOTSOCK))
+        unsupported = OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        with mock.patch.object(_copy, "_reflink", return_value=False), \
+                mock.patch.object(_copy, "_copy_file_range", side_effect=unsupported), \
+                mock.patch.object(_copy, "_sendfile", side_effect=not_socket):
+            copy_tree(self.src, self.dst)
+        self.assertTreeCopied("*")
+
+    @mock.patch("sys.platform", "darwin")
+    def test_copy_tree_sendfile_linux_only(self):
+        with mock.patch.object(_copy, "_reflink", return_value=False), \
+                mock.patch.object(_copy, "_copy_file_range", side_effect=OSError(errno.ENOSYS, "")), \
+                mock.patch.object(_copy, "_sendfile") as mock_sendfile:
+            copy_tree(self.src, self.dst)
+            self.assertFalse(mock_sendfile.called)
+        self.assertTreeCopied("*")
+
+    @unittest.skipUnless(hasattr(os, "copy_file_range"), "os.copy_file_range is not available")
+    def test_copy_tree_error(self):
+        with mock.patch.object(_copy, "_reflink", return_value=False), \
+                mock.patch.object(_copy, "_copy_file_range", side_effect=OSError(errno.EIO, "I/O error")):
+            with self.assertRaises(OSError):
+                copy_tree(self.src, self.dst)
+
+    def test_copy_tree_same_directory(self):
+        path = os.path.join(self.src, "file01.txt")
+        data = read_file(path)
+        with self.assertRaises(shutil.SameFileError):
+            copy_tree(self.src, self.src)
+        with self.assertRaises(shutil.SameFileError):
+            copy_tree(self.src, os.path.join(self.src, "1", ".."))
+        self.assertEqual(read_file(path), data)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "os.symlink is not available")
+    def test_copy_tree_same_file(self):
+        # the destination tree links back to the source files
+        path = os.path.join(self.src, "file01.txt")
+        data = read_file(path)
+        os.makedirs(self.dst)
+        os.symlink(path, os.path.join(self.dst, "file01.txt"))
+        with self.assertRaises(shutil.SameFileError):
+            copy_tree(self.src, self.dst, "file01.txt")
+        self.assertEqual(read_file(path), data)
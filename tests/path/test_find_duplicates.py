@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import unittest
+
+from unittest import mock
+
+from mup.path import create_directories, temp_path
+from mup.path import find_duplicates, hash_files
+from mup.path import _hash
+
+BLOCK = _hash.PARTIAL_BLOCK_SIZE
+
+
+def write_file(path: str, data: bytes) -> str:
+    create_directories(path, is_file=True)
+    with open(path, "wb") as fp:
+        fp.write(data)
+    return path
+
+
+class TestHashFiles(unittest.TestCase):
+    def test_hash_files(self):
+        with temp_path() as tmp:
+            data = os.urandom(_hash.READ_BUFFER_SIZE * 2 + 123)
+            path = write_file(os.path.join(tmp, "file.bin"), data)
+            empty = write_file(os.path.join(tmp, "empty.bin"), b"")
+            digests = hash_files([path, empty])
+            self.assertEqual(digests[path], hashlib.sha256(data).hexdigest())
+            self.assertEqual(digests[empty], hashlib.sha256(b"").hexdigest())
+
+    def test_hash_files_missing(self):
+        with temp_path() as tmp:
+            with self.assertRaises(FileNotFoundError):
+                hash_files([os.path.join(tmp, "missing.bin")])
+
+    def test_hash_files_cache(self):
+        with temp_path() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            path = write_file(os.path.join(tmp, "file.bin"), b"test")
+            expected = hash_files([path], cache_path=cache_path)
+            self.assertTrue(os.path.isfile(cache_path))
+            with mock.patch.object(_hash, "_full_digest") as mock_digest:
+                self.assertEqual(hash_files([path], cache_path=cache_path), expected)
+                self.assertFalse(mock_digest.called)
+            write_file(path, b"changed")
+            self.assertEqual(hash_files([path], cache_path=cache_path)[path], hashlib.sha256(b"changed").hexdigest())
+
+    def test_hash_files_cache_algorithm(self):
+        with temp_path() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            path = write_file(os.path.join(tmp, "file.bin"), b"test")
+            hash_files([path], cache_path=cache_path)
+            digests = hash_files([path], algorithm="md5", cache_path=cache_path)
+            self.assertEqual(digests[path], hashlib.md5(b"test").hexdigest())
+
+
+class TestFindDuplicates(unittest.TestCase):
+    def test_find_duplicates(self):
+        with temp_path() as tmp:
+            write_file(os.path.join(tmp, "a.txt"), b"same")
+            write_file(os.path.join(tmp, "1", "b.txt"), b"same")
+            write_file(os.path.join(tmp, "1", "c.txt"), b"diff")
+            write_file(os.path.join(tmp, "1", "d.py"), b"same")
+            write_file(os.path.join(tmp, "e.txt"), b"unique size")
+            self.assertEqual(find_duplicates(tmp, "*.txt"), [])
+            self.assertEqual(find_duplicates(tmp, "*.txt", recursive=True),
+                             [[os.path.join(tmp, "1", "b.txt"), os.path.join(tmp, "a.txt")]])
+            self.assertEqual(len(find_duplicates(tmp, ("*.txt", "*.py"), recursive=True)[0]), 3)
+
+    def test_find_duplicates_large(self):
+        with temp_path() as tmp:
+            data = os.urandom(BLOCK * 4)
+            middle = bytearray(data)
+            middle[BLOCK * 2] ^= 0xff
+            write_file(os.path.join(tmp, "a.bin"), data)
+            write_file(os.path.join(tmp, "b.bin"), data)
+            write_file(os.path.join(tmp, "c.bin"), bytes(middle))  # only differs in the middle
+            write_file(os.path.join(tmp, "d.bin"), data[:-1] + b"x")
+            self.assertEqual(find_duplicates(tmp, "*.bin"),
+                             [[os.path.join(tmp, "a.bin"), os.path.join(tmp, "b.bin")]])
+
+    def test_find_duplicates_skips_full_hash(self):
+        with temp_path() as tmp:
+            write_file(os.path.join(tmp, "a.bin"), b"a" * BLOCK * 3)
+            write_file(os.path.join(tmp, "b.bin"), b"b" * BLOCK * 3)
+            write_file(os.path.join(tmp, "c.bin"), b"c" * BLOCK)
+            write_file(os.path.join(tmp, "d.bin"), b"c" * BLOCK)
+            with mock.patch.object(_hash, "_full_digest") as mock_digest:
+                self.assertEqual(len(find_duplicates(tmp, "*.bin")), 1)
+                self.assertFalse(mock_digest.called)
+
+    def test_find_duplicates_cache(self):
+        with temp_path() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            write_file(os.path.join(tmp, "a.bin"), b"a" * BLOCK * 3)
+            write_file(os.path.join(tmp, "b.bin"), b"a" * BLOCK * 3)
+            expected = find_duplicates(tmp, "*.bin", cache_path=cache_path)
+            self.assertEqual(len(expected), 1)
+            with mock.patch.object(_hash, "_partial_digest") as mock_partial, \
+                    mock.patch.object(_hash, "_full_digest") as mock_full:
+                self.assertEqual(find_duplicates(tmp, "*.bin", cache_path=cache_path), expected)
+                self.assertFalse(mock_partial.called)
+                self.assertFalse(mock_full.called)
+
+    def test_find_duplicates_cache_prune(self):
+        with temp_path() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            write_file(os.path.join(tmp, "a.bin"), b"a" * BLOCK * 3)
+            write_file(os.path.join(tmp, "b.bin"), b"a" * BLOCK * 3)
+            write_file(os.path.join(tmp, "c.bin"), b"c" * BLOCK)
+            write_file(os.path.join(tmp, "d.bin"), b"d" * BLOCK)
+            find_duplicates(tmp, "*.bin", cache_path=cache_path)
+            with open(cache_path, "r") as fp:
+                self.assertEqual(len(json.load(fp)["entries"]), 4)
+            os.remove(os.path.join(tmp, "c.bin"))
+            os.remove(os.path.join(tmp, "d.bin"))
+            write_file(os.path.join(tmp, "b.bin"), b"b" * BLOCK * 3)
+            self.assertEqual(find_duplicates(tmp, "*.bin", cache_path=cache_path), [])
+            with open(cache_path, "r") as fp:
+                self.assertEqual(len(json.load(fp)["entries"]), 2)
+
+    def test_find_duplicates_cache_shared(self):
+        with temp_path() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            root = os.path.join(tmp, "root")
+            other = write_file(os.path.join(tmp, "other", "file.bin"), b"other")
+            unique = write_file(os.path.join(root, "unique.bin"), b"unique size")
+            write_file(os.path.join(root, "a.bin"), b"a" * BLOCK)
+            write_file(os.path.join(root, "b.bin"), b"b" * BLOCK)
+            hash_files([other, unique], cache_path=cache_path)
+            find_duplicates(root, "*.bin", cache_path=cache_path)
+            with open(cache_path, "r") as fp:
+                entries = json.load(fp)["entries"]
+            # hash_files' entries, including the unique sized file, are kept
+            self.assertEqual(len(entries), 4)
+            with mock.patch.object(_hash, "_full_digest") as mock_digest:
+                hash_files([other, unique], cache_path=cache_path)
+                self.assertFalse(mock_digest.called)
+
+    @unittest.skipUnless(hasattr(os, "link") and hasattr(os, "symlink"), "links are not available")
+    def test_find_duplicates_links(self):
+        with temp_path() as tmp:
+            path = write_file(os.path.join(tmp, "a.bin"), b"same")
+            os.link(path, os.path.join(tmp, "hard.bin"))
+            os.symlink(path, os.path.join(tmp, "link.bin"))
+            self.assertEqual(find_duplicates(tmp, "*.bin"), [])
+            copy = write_file(os.path.join(tmp, "copy.bin"), b"same")
+            groups = find_duplicates(tmp, "*.bin")
+            self.assertEqual(len(groups), 1)
+            self.assertEqual(len(groups[0]), 2)
+            self.assertIn(copy, groups[0])
+            self.assertNotIn(os.path.join(tmp, "link.bin"), groups[0])
@@ -0,0 +1,213 @@
+import errno
+import os
+import pathlib
+import shutil
+import sys
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from mup.path import create_directories, temp_path
+from mup.path import FileWatcher, WatchAction, WatchEvent, watch_files
+
+
+def write_file(path: str, data: str = "test") -> None:
+    create_directories(path, is_file=True)
+    with open(path, "w") as fp:
+        fp.write(data)
+
+
+class WatchFilesMixin(object):
+    force_polling = False
+
+    def watcher(self, path, patterns, **kwargs):
+        return FileWatcher(path, patterns, force_polling=self.force_polling,
+                           interval=0.05, debounce=0.1, **kwargs)
+
+    def test_initial_scan(self):
+        with temp_path() as tmp:
+            write_file(os.path.join(tmp, "file01.txt"))
+            write_file(os.path.join(tmp, "file02.py"))
+            write_file(os.path.join(tmp, "1", "file03.txt"))
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                self.assertEqual(len(watcher.files()), 2)
+                self.assertEqual(watcher.poll(timeout=0.2), [])
+
+    def test_created_modified_deleted(self):
+        with temp_path() as tmp:
+            path = os.path.join(tmp, "file.txt")
+            with self.watcher(tmp, "*.txt") as watcher:
+                write_file(path)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, path)])
+                write_file(path, "modified")
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.MODIFIED, path)])
+                os.remove(path)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.DELETED, path)])
+
+    def test_ignores_non_matching(self):
+        with temp_path() as tmp:
+            with self.watcher(tmp, ("*.txt", "*.py")) as watcher:
+                write_file(os.path.join(tmp, "file.sh"))
+                self.assertEqual(watcher.poll(timeout=0.3), [])
+                write_file(os.path.join(tmp, "file.py"))
+                events = watcher.poll(timeout=5)
+                self.assertEqual([os.path.basename(e.path) for e in events], ["file.py"])
+
+    def test_debounce(self):
+        with temp_path() as tmp:
+            path = os.path.join(tmp, "file.txt")
+            with self.watcher(tmp, "*.txt") as watcher:
+                for i in range(10):
+                    write_file(path, "x" * i)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, path)])
+
+    def busy_writer(self, path: str, stop: threading.Event) -> threading.Thread:
+        def _write():
+            with open(path, "a") as fp:
+                while not stop.is_set():
+                    fp.write("x")
+                    fp.flush()
+                    time.sleep(0.03)
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+        return writer
+
+    def test_busy_non_matching_file(self):
+        with temp_path() as tmp:
+            stop = threading.Event()
+            with self.watcher(tmp, "*.parquet") as watcher:
+                writer = self.busy_writer(os.path.join(tmp, "app.log"), stop)
+                try:
+                    self.assertEqual(watcher.poll(timeout=0.5), [])
+                    path = os.path.join(tmp, "new.parquet")
+                    write_file(path)
+                    start = time.monotonic()
+                    self.assertEqual(watcher.poll(timeout=1.0), [WatchEvent(WatchAction.CREATED, path)])
+                    self.assertLess(time.monotonic() - start, 1.0)
+                finally:
+                    stop.set()
+                    writer.join()
+
+    def test_max_latency(self):
+        with temp_path() as tmp:
+            stop = threading.Event()
+            path = os.path.join(tmp, "busy.txt")
+            with self.watcher(tmp, "*.txt", max_latency=0.3) as watcher:
+                writer = self.busy_writer(path, stop)
+                try:
+                    start = time.monotonic()
+                    self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, path)])
+                    self.assertLess(time.monotonic() - start, 2.0)
+                finally:
+                    stop.set()
+                    writer.join()
+
+    def test_missing_root(self):
+        with temp_path() as tmp:
+            missing = os.path.join(tmp, "missing")
+            with self.assertRaises(FileNotFoundError):
+                self.watcher(missing, "*.txt", recursive=True)
+            with self.assertRaises(FileNotFoundError):
+                self.watcher(missing, "*.txt")
+            path = os.path.join(tmp, "file.txt")
+            write_file(path)
+            with self.assertRaises(NotADirectoryError):
+                self.watcher(path, "*.txt", recursive=True)
+
+    def test_new_directories(self):
+        with temp_path() as tmp:
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                path = os.path.join(tmp, "1", "2", "file.txt")
+                write_file(path)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, path)])
+                nested = os.path.join(tmp, "1", "2", "3", "file.txt")
+                write_file(nested)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, nested)])
+
+    def test_deleted_directory(self):
+        with temp_path() as tmp:
+            write_file(os.path.join(tmp, "1", "file01.txt"))
+            write_file(os.path.join(tmp, "1", "2", "file02.txt"))
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                shutil.rmtree(os.path.join(tmp, "1"))
+                events = watcher.poll(timeout=5)
+                self.assertEqual(len(events), 2)
+                self.assertTrue(all(e.action == WatchAction.DELETED for e in events))
+
+    def test_moved_directory(self):
+        with temp_path() as tmp:
+            write_file(os.path.join(tmp, "1", "file.txt"))
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                os.rename(os.path.join(tmp, "1"), os.path.join(tmp, "2"))
+                events = watcher.poll(timeout=5)
+                self.assertIn(WatchEvent(WatchAction.DELETED, os.path.join(tmp, "1", "file.txt")), events)
+                self.assertIn(WatchEvent(WatchAction.CREATED, os.path.join(tmp, "2", "file.txt")), events)
+                pathlib.Path(os.path.join(tmp, "2", "new.txt")).touch()
+                events = watcher.poll(timeout=5)
+                self.assertEqual(events, [WatchEvent(WatchAction.CREATED, os.path.join(tmp, "2", "new.txt"))])
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on linux")
+class TestWatchFilesInotify(WatchFilesMixin, unittest.TestCase):
+    force_polling = False
+
+    def test_watch_failure(self):
+        with temp_path() as tmp:
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                no_space = OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+                with mock.patch.object(watcher._backend, "_add_watch", side_effect=no_space):
+                    path = os.path.join(tmp, "1", "file.txt")
+                    write_file(path)
+                    with self.assertLogs("mup.path._watch", "WARNING"):
+                        events = watcher.poll(timeout=5)
+                self.assertEqual(events, [WatchEvent(WatchAction.CREATED, path)])
+                self.assertNotIn(os.path.join(tmp, "1"), watcher._backend._watches.values())
+
+    def test_overflow(self):
+        from mup.path import _watch
+        with temp_path() as tmp:
+            with self.watcher(tmp, "*.txt", recursive=True) as watcher:
+                backend = watcher._backend
+                # simulate the directory being created while events were dropped
+                with mock.patch.object(backend, "_add_watch"):
+                    write_file(os.path.join(tmp, "1", "file01.txt"))
+                    watcher.poll(timeout=5)
+                self.assertNotIn(os.path.join(tmp, "1"), backend._watches.values())
+
+                overflow = _watch.INOTIFY_EVENT.pack(-1, _watch.IN_Q_OVERFLOW, 0, 0)
+                with mock.patch("os.read", side_effect=[overflow, BlockingIOError()]):
+                    _, dirs = backend.read()
+                self.assertEqual(dirs, {tmp})
+                self.assertIn(os.path.join(tmp, "1"), backend._watches.values())
+
+                path = os.path.join(tmp, "1", "file02.txt")
+                write_file(path)
+                self.assertEqual(watcher.poll(timeout=5), [WatchEvent(WatchAction.CREATED, path)])
+
+    def test_backend(self):
+        from mup.path._watch import _InotifyBackend
+        with temp_path() as tmp:
+            with self.watcher(tmp, "*.txt") as watcher:
+                self.assertIsInstance(watcher._backend, _InotifyBackend)
+
+
+class TestWatchFilesPolling(WatchFilesMixin, unittest.TestCase):
+    force_polling = True
+
+
+class TestWatchFilesGenerator(unittest.TestCase):
+    def test_watch_files(self):
+        with temp_path() as tmp:
+            path = os.path.join(tmp, "file.txt")
+            # the initial scan happens on the first `next`, so write from a thread
+            timer = threading.Timer(0.2, write_file, args=(path, ))
+            timer.start()
+            events = watch_files(tmp, "*.txt", force_polling=True, interval=0.05, debounce=0.05)
+            try:
+                self.assertEqual(next(events), WatchEvent(WatchAction.CREATED, path))
+            finally:
+                events.close()
+                timer.join()
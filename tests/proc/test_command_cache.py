@@ -0,0 +1,182 @@
+import os
+import sys
+import unittest
+
+from unittest import mock
+
+from mup.path import temp_path
+from mup.proc import CommandCache, CommandRunner
+
+COUNTER_SCRIPT = """
+import sys
+with open(sys.argv[1], "a") as fp:
+    fp.write("x")
+print("output")
+"""
+
+
+class TestCommandCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = temp_path()
+        self.tmp = self._tmp.__enter__()
+        self.cache = CommandCache(os.path.join(self.tmp, "cache"))
+        self.counter = os.path.join(self.tmp, "counter")
+        self.command = (sys.executable, "-c", COUNTER_SCRIPT, self.counter)
+
+    def tearDown(self) -> None:
+        self._tmp.__exit__(None, None, None)
+
+    def run_count(self) -> int:
+        try:
+            with open(self.counter, "r") as fp:
+                return len(fp.read())
+        except FileNotFoundError:
+            return 0
+
+    def test_cached(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        first = cmd.run(self.command, cached=True)
+        second = cmd.run(self.command, cached=True)
+        self.assertEqual(first, second)
+        self.assertEqual(first.stdout.strip(), "output")
+        self.assertEqual(self.run_count(), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.entries), (1, 1, 1))
+
+    def test_not_cached_by_default(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command)
+        cmd.run(self.command)
+        self.assertEqual(self.run_count(), 2)
+        self.assertEqual(self.cache.stats().entries, 0)
+
+    def test_not_silent(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command, cached=True, silent=False)
+        cmd.run(self.command, cached=True, silent=False)
+        self.assertEqual(self.run_count(), 2)
+
+    def test_failure_not_cached(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        command = (sys.executable, "-c", "import sys; sys.exit(1)")
+        self.assertEqual(cmd.run(command, cached=True).result, 1)
+        self.assertEqual(self.cache.stats().entries, 0)
+
+    def test_no_cache(self):
+        with self.assertRaises(ValueError):
+            CommandRunner(cwd=self.tmp).run(self.command, cached=True)
+
+    def test_env_keys(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command, cached=True, cache_env=["TEST"])
+        cmd.env_var_add("OTHER", "1")
+        cmd.run(self.command, cached=True, cache_env=["TEST"])
+        self.assertEqual(self.run_count(), 1)
+        cmd.env_var_add("TEST", "1")
+        cmd.run(self.command, cached=True, cache_env=["TEST"])
+        self.assertEqual(self.run_count(), 2)
+
+    def test_cwd(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command, cached=True)
+        cmd.run(self.command, cached=True, cwd=os.path.join(self.tmp, "cache"))
+        self.assertEqual(self.run_count(), 2)
+
+    def test_inputs(self):
+        input_path = os.path.join(self.tmp, "input.txt")
+        with open(input_path, "w") as fp:
+            fp.write("1")
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command, cached=True, cache_inputs=[input_path])
+        cmd.run(self.command, cached=True, cache_inputs=[input_path])
+        self.assertEqual(self.run_count(), 1)
+        with open(input_path, "w") as fp:
+            fp.write("2")
+        cmd.run(self.command, cached=True, cache_inputs=[input_path])
+        self.assertEqual(self.run_count(), 2)
+
+    def test_relative_inputs(self):
+        # inputs are resolved against the command's cwd, not the process cwd
+        work = os.path.join(self.tmp, "work")
+        os.makedirs(work)
+        with open(os.path.join(work, "input.txt"), "w") as fp:
+            fp.write("1")
+        with open(os.path.join(self.tmp, "input.txt"), "w") as fp:
+            fp.write("decoy")
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        try:
+            cmd = CommandRunner(cwd=work, cache=self.cache)
+            cmd.run(self.command, cached=True, cache_inputs=["input.txt"])
+            cmd.run(self.command, cached=True, cache_inputs=["input.txt"])
+            self.assertEqual(self.run_count(), 1)
+            with open(os.path.join(work, "input.txt"), "w") as fp:
+                fp.write("2")
+            cmd.run(self.command, cached=True, cache_inputs=["input.txt"])
+            self.assertEqual(self.run_count(), 2)
+        finally:
+            os.chdir(cwd)
+
+    def test_relative_inputs_missing(self):
+        work = os.path.join(self.tmp, "work")
+        os.makedirs(work)
+        with open(os.path.join(self.tmp, "input.txt"), "w") as fp:
+            fp.write("1")
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        try:
+            cmd = CommandRunner(cwd=work, cache=self.cache)
+            with self.assertRaises(FileNotFoundError):
+                cmd.run(self.command, cached=True, cache_inputs=["input.txt"])
+        finally:
+            os.chdir(cwd)
+
+    def test_eviction(self):
+        cache = CommandCache(os.path.join(self.tmp, "small"), max_size=1)
+        cmd = CommandRunner(cwd=self.tmp, cache=cache)
+        cmd.run(self.command, cached=True)
+        self.assertEqual(cache.stats().entries, 0)
+
+    def test_lru_eviction(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        keys = []
+        for i in range(3):
+            key = self.cache.key(("test", str(i)), cwd=self.tmp, env={})
+            self.cache.set(key, cmd.run(self.command))
+            os.utime(os.path.join(self.cache.path, f"{key}.json"), ns=(i * 10 ** 9, i * 10 ** 9))
+            keys.append(key)
+        self.assertIsNotNone(self.cache.get(keys[0]))  # now the most recently used
+        self.cache.max_size = self.cache.stats().size - 1
+        self.cache.set(keys[2], self.cache.get(keys[2]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+
+    def test_size_tracking(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        result = cmd.run(self.command)
+        with mock.patch.object(self.cache, "_entries", wraps=self.cache._entries) as mock_entries:
+            for i in range(5):
+                self.cache.set(self.cache.key(("test", str(i)), cwd=self.tmp, env={}), result)
+            # one scan to initialise the running total, none for the following sets
+            self.assertEqual(mock_entries.call_count, 1)
+        self.assertEqual(self.cache._size, self.cache.stats().size)
+        # overwriting an entry doesn't count it twice
+        self.cache.set(self.cache.key(("test", "0"), cwd=self.tmp, env={}), result)
+        self.assertEqual(self.cache._size, self.cache.stats().size)
+
+    def test_size_tracking_eviction(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        result = cmd.run(self.command)
+        self.cache.set(self.cache.key(("test", "0"), cwd=self.tmp, env={}), result)
+        self.cache.max_size = self.cache.stats().size * 2
+        for i in range(1, 5):
+            self.cache.set(self.cache.key(("test", str(i)), cwd=self.tmp, env={}), result)
+        stats = self.cache.stats()
+        self.assertEqual(stats.entries, 2)
+        self.assertEqual(self.cache._size, stats.size)
+
+    def test_clear(self):
+        cmd = CommandRunner(cwd=self.tmp, cache=self.cache)
+        cmd.run(self.command, cached=True)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats().entries, 0)
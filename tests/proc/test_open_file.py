@@ -1,11 +1,24 @@
+import sys
+import threading
+import time
 import unittest
 
 from unittest import mock
 
-from mup.proc import open_file
+import mup.proc
 
+from mup.proc import open_file, open_files
 
+
+def fake_which(name: str) -> str:
+    return f"/usr/bin/{name}"
+
+
+@mock.patch("shutil.which", fake_which)
 class TestOpenFile(unittest.TestCase):
+    def setUp(self) -> None:
+        mup.proc._find_opener.cache_clear()
+
     @mock.patch('sys.platform', "win32")
     def test_open_file_win32(self):
         with mock.patch("os.startfile", create=True) as mock_startfile:
@@ -18,11 +31,52 @@ class TestOpenFile(unittest.TestCase):
         with mock.patch("subprocess.call") as mock_call:
             open_file("testfile")
             self.assertTrue(mock_call.called)
-            mock_call.assert_called_once_with(["xdg-open", "testfile"])
+            mock_call.assert_called_once_with(["/usr/bin/xdg-open", "testfile"])
 
     @mock.patch('sys.platform', "darwin")
     def test_open_file_darwin(self):
         with mock.patch("subprocess.call") as mock_call:
             open_file("testfile")
             self.assertTrue(mock_call.called)
-            mock_call.assert_called_once_with(["open", "testfile"])
+            mock_call.assert_called_once_with(["/usr/bin/open", "testfile"])
+
+    @mock.patch('sys.platform', "linux")
+    def test_open_file_no_wait(self):
+        with mock.patch("subprocess.Popen") as mock_popen, mock.patch("subprocess.call") as mock_call:
+            open_file("testfile", wait=False)
+            self.assertFalse(mock_call.called)
+            args, kwargs = mock_popen.call_args
+            self.assertEqual(args[0], ["/usr/bin/xdg-open", "testfile"])
+            self.assertTrue(kwargs["start_new_session"])
+
+    @mock.patch('sys.platform', "linux")
+    def test_open_file_no_wait_reaped(self):
+        with mock.patch.object(mup.proc, "_find_opener", return_value=sys.executable), \
+                mock.patch("threading.Thread", wraps=threading.Thread) as mock_thread:
+            open_file("-c", wait=False)
+            _, kwargs = mock_thread.call_args
+            self.assertIs(kwargs["target"], mup.proc._reap)
+            proc = kwargs["args"][0]
+        deadline = time.monotonic() + 10
+        while proc.returncode is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNotNone(proc.returncode)
+
+    @mock.patch('sys.platform', "linux")
+    def test_open_files(self):
+        with mock.patch("subprocess.Popen") as mock_popen:
+            open_files(["testfile01", "testfile02"])
+            self.assertEqual([c[0][0][1] for c in mock_popen.call_args_list], ["testfile01", "testfile02"])
+
+    @mock.patch('sys.platform', "linux")
+    def test_opener_cached(self):
+        with mock.patch("shutil.which", side_effect=fake_which) as mock_which, mock.patch("subprocess.call"):
+            open_file("testfile01")
+            open_file("testfile02")
+            mock_which.assert_called_once_with("xdg-open")
+
+    @mock.patch('sys.platform', "linux")
+    def test_opener_missing(self):
+        with mock.patch("shutil.which", return_value=None), mock.patch("subprocess.call") as mock_call:
+            open_file("testfile")
+            mock_call.assert_called_once_with(["xdg-open", "testfile"])
@@ -0,0 +1,89 @@
+import os
+import sys
+import unittest
+
+from mup.proc import CommandRunner
+from mup.path import temp_path
+
+PY = sys.executable
+
+
+def py(script: str) -> tuple:
+    return PY, "-c", script
+
+
+class TestPipeline(unittest.TestCase):
+    def test_pipeline(self):
+        cmd = CommandRunner()
+        result = cmd.pipeline([
+            py("print('b\\na\\nb')"),
+            py("import sys; sys.stdout.write(''.join(sorted(sys.stdin)))"),
+            py("import sys; sys.stdout.write(sys.stdin.read().upper())"),
+        ])
+        self.assertEqual(result.result, 0)
+        self.assertEqual(result.stdout, "A\nB\nB\n")
+        self.assertEqual(len(result.stages), 3)
+        self.assertEqual([s.result for s in result.stages], [0, 0, 0])
+        self.assertIsNone(result.stages[0].stdout)
+        self.assertEqual(result.stages[-1].stdout, result.stdout)
+
+    def test_pipeline_single(self):
+        result = CommandRunner().pipeline([py("print('test')")])
+        self.assertEqual(result.stdout, "test\n")
+
+    def test_pipeline_empty(self):
+        with self.assertRaises(ValueError):
+            CommandRunner().pipeline([])
+
+    def test_pipeline_pipefail(self):
+        cmd = CommandRunner()
+        result = cmd.pipeline([
+            py("import sys; sys.stderr.write('first'); sys.exit(3)"),
+            py("import sys; sys.stderr.write('second'); sys.exit(4)"),
+            py("import sys; sys.stdin.read()"),
+        ])
+        self.assertEqual(result.result, 4)
+        self.assertEqual([s.result for s in result.stages], [3, 4, 0])
+        self.assertEqual([s.stderr for s in result.stages], ["first", "second", ""])
+
+    def test_pipeline_large(self):
+        # more data than fits in a pipe buffer, with stderr output from every stage
+        cmd = CommandRunner()
+        result = cmd.pipeline([
+            py("import sys; sys.stderr.write('x' * 1000000); sys.stdout.write('y' * 1000000)"),
+            py("import sys; data = sys.stdin.read(); sys.stderr.write(data); sys.stdout.write(data)"),
+            py("import sys; print(len(sys.stdin.read()))"),
+        ])
+        self.assertEqual(result.result, 0)
+        self.assertEqual(result.stdout.strip(), "1000000")
+        self.assertEqual(len(result.stages[0].stderr), 1000000)
+        self.assertEqual(len(result.stages[1].stderr), 1000000)
+
+    def test_pipeline_early_exit(self):
+        cmd = CommandRunner()
+        result = cmd.pipeline([
+            py("import sys\nwhile True: sys.stdout.write('y' * 1024)"),
+            py("import sys; print(sys.stdin.read(10))"),
+        ])
+        self.assertEqual(result.stdout.strip(), "y" * 10)
+        self.assertNotEqual(result.stages[0].result, 0)
+
+    def test_pipeline_cwd_env(self):
+        with temp_path() as tmp:
+            cmd = CommandRunner(cwd=tmp, env=dict(os.environ, TEST="1234"))
+            result = cmd.pipeline([
+                py("import os; print(os.getcwd()); print(os.environ['TEST'])"),
+                py("import sys; sys.stdout.write(sys.stdin.read())"),
+            ])
+            cwd, value = result.stdout.split()
+            self.assertEqual(os.path.realpath(cwd), os.path.realpath(tmp))
+            self.assertEqual(value, "1234")
+
+    def test_pipeline_not_silent(self):
+        result = CommandRunner().pipeline([py("print('test')"), py("import sys; sys.stdin.read()")], silent=False)
+        self.assertEqual(result.result, 0)
+        self.assertIsNone(result.stdout)
+
+    def test_pipeline_missing_command(self):
+        with self.assertRaises(FileNotFoundError):
+            CommandRunner().pipeline([py("print('test')"), ("this-command-does-not-exist", )])
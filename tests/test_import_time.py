@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(statement: str) -> set:
+    """ Run `statement` in a fresh interpreter with `-X importtime` and return
+    the names of all modules that were imported by it. """
+    proc = subprocess.run((sys.executable, "-X", "importtime", "-c", statement),
+                          cwd=ROOT_PATH, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        name = line.rsplit("|", 1)[-1].strip()
+        if name == "imported package":  # header line
+            continue
+        modules.add(name)
+    return modules
+
+
+class TestImportTime(unittest.TestCase):
+    def test_import_path(self):
+        modules = imported_modules("import mup.path")
+        self.assertIn("mup.path", modules)
+        for name in ("fnmatch", "random", "tempfile", "subprocess"):
+            self.assertNotIn(name, modules)
+
+    def test_import_create_directories(self):
+        modules = imported_modules("from mup.path import create_directories")
+        for name in ("fnmatch", "random", "tempfile", "subprocess"):
+            self.assertNotIn(name, modules)
+
+    def test_import_find_files(self):
+        modules = imported_modules("from mup.path import find_files")
+        self.assertIn("fnmatch", modules)
+        self.assertNotIn("random", modules)
+
+    def test_import_proc(self):
+        modules = imported_modules("import mup.proc")
+        self.assertIn("mup.proc", modules)
+        self.assertNotIn("subprocess", modules)
+
+    def test_import_command_runner(self):
+        modules = imported_modules("from mup.proc import CommandRunner")
+        self.assertIn("subprocess", modules)
+
+
+class TestLazyAttributes(unittest.TestCase):
+    def test_lazy_path_attributes(self):
+        import mup.path
+        self.assertIn("find_files", dir(mup.path))
+        self.assertTrue(callable(mup.path.find_files))
+        self.assertTrue(callable(mup.path.get_unique_name))
+        with self.assertRaises(AttributeError):
+            getattr(mup.path, "not_a_real_attribute")
+
+    def test_lazy_proc_attributes(self):
+        import mup.proc
+        self.assertIn("CommandRunner", dir(mup.proc))
+        self.assertTrue(callable(mup.proc.CommandRunner))
+        with self.assertRaises(AttributeError):
+            getattr(mup.proc, "not_a_real_attribute")
+
+    def test_find_files_pattern_cache(self):
+        from mup.path._find import _compile_patterns
+        self.assertIs(_compile_patterns(("*.py", "*.txt")), _compile_patterns(("*.py", "*.txt")))